@@ -5,21 +5,187 @@ This module provides tools for resolving blockchain transactions using the third
 """
 
 import asyncio
-import os
-from pydantic_ai import Agent, RunContext
-from thirdweb_ai import Insight, Nebula
-from thirdweb_ai.adapters.pydantic_ai import get_pydantic_ai_tools
+import functools
+from typing import Callable, Optional
 
+from pydantic import BaseModel, Field
+from pydantic_ai import Agent, RunContext, Tool
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolCallPart,
+)
 
-def initialize_services():
-    """Initialize thirdweb services and AI agent."""
-    insight = Insight(secret_key=os.getenv("THIRDWEB_SECRET_KEY"), chain_id=1)
-    nebula = Nebula(secret_key=os.getenv("THIRDWEB_SECRET_KEY"))
-    blockchain_tools = get_pydantic_ai_tools(insight.get_tools() + nebula.get_tools())
+import chains
+import response_cache
+import thirdweb_client
+
+
+class AgentAnswer(BaseModel):
+    """The agent's answer to a query, with the transaction it is about if known."""
+
+    text: str = Field(description="The agent's answer")
+    tx_hash: Optional[str] = Field(
+        None, description="The hash of the single transaction the answer is about"
+    )
+    chain_id: Optional[int] = Field(
+        None, description="The ID of the chain that transaction is on"
+    )
+
+
+# Transaction lookups in flight, so later callers join them instead of re-requesting
+_lookups: dict[tuple[str, tuple[int, ...]], asyncio.Task] = {}
+
+
+async def _resolve_transaction(tx_hash: str, chain: list[int]) -> dict:
+    # Mined transactions are immutable, so a previous lookup is always valid
+    cached = response_cache.get_transaction(tx_hash, chain)
+    if cached is not None:
+        return cached
+
+    insight, _, _ = thirdweb_client.get_thirdweb_services()
+    result = await thirdweb_client.service_get(
+        insight, f"resolve/{tx_hash}", {"chain": chain}
+    )
+    response_cache.set_transaction(tx_hash, chain, result)
+    return result
+
+
+def _forget_lookup(key: tuple[str, tuple[int, ...]], task: asyncio.Task) -> None:
+    _lookups.pop(key, None)
+    # A failed prefetch is simply retried by the tool, so don't report it as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+def fetch_transaction(tx_hash: str, chain: list[int]) -> asyncio.Task:
+    """Start a lookup of a transaction, or join the one already in flight."""
+    key = (tx_hash.lower(), tuple(sorted(chain)))
+    task = _lookups.get(key)
+    if task is None:
+        task = asyncio.create_task(_resolve_transaction(tx_hash, chain))
+        _lookups[key] = task
+        task.add_done_callback(functools.partial(_forget_lookup, key))
+    return task
+
+
+def prefetch_transactions(text: str) -> None:
+    """
+    Start looking up the transactions mentioned in a question before it is asked.
+
+    Only runs when the text names a chain or chain ID, so the guess matches the
+    lookup the agent is likely to make.
+    """
+    chain_id = chains.find_chain_id(text)
+    if chain_id is None:
+        return
+    for tx_hash in chains.TX_HASH_RE.findall(text):
+        fetch_transaction(tx_hash, [chain_id])
+
+
+async def analyze_tx(ctx: RunContext, tx_hash: str, chain_id: int) -> dict:
+    """Analyze a transaction hash to get raw transaction data."""
+    chain = [chain_id] if not isinstance(chain_id, list) else chain_id
+    # Shielded so a cancelled tool call doesn't cancel a lookup others are waiting on
+    return await asyncio.shield(fetch_transaction(tx_hash, chain))
+
+
+async def analyze_txs(
+    ctx: RunContext, tx_hashes: list[str], chain_id: int
+) -> list[dict]:
+    """Analyze several transaction hashes on the same chain in a single call."""
+    # Insight has no batch resolve endpoint, so issue the lookups concurrently
+    return await asyncio.gather(
+        *(analyze_tx(ctx, tx_hash, chain_id) for tx_hash in tx_hashes)
+    )
+
+
+def looked_up_transactions(
+    messages: list[ModelMessage],
+) -> list[tuple[str, list[int]]]:
+    """List the (hash, chain) pairs an agent run asked the analyze tools for."""
+    lookups = []
+    for message in messages:
+        if not isinstance(message, ModelResponse):
+            continue
+        for part in message.parts:
+            if not isinstance(part, ToolCallPart):
+                continue
+            try:
+                args = part.args_as_dict()
+            except (ValueError, AssertionError):
+                # Malformed arguments never reached the tool
+                continue
+            chain = args.get("chain_id")
+            chain = [chain] if not isinstance(chain, list) else chain
+            if part.tool_name == "analyze_transaction":
+                tx_hashes = [args.get("tx_hash")]
+            elif part.tool_name == "analyze_transactions":
+                tx_hashes = args.get("tx_hashes") or []
+            else:
+                continue
+            lookups.extend(
+                (tx_hash, chain) for tx_hash in tx_hashes if isinstance(tx_hash, str)
+            )
+    return lookups
+
+
+def find_transaction(
+    query: str, messages: list[ModelMessage]
+) -> tuple[Optional[str], Optional[int]]:
+    """
+    Work out which transaction a run was about, as (hash, chain ID).
+
+    Uses the analyze tool lookups that found a transaction, or failing those the
+    hash and chain named in the query, for hashes the agent never looked up. A
+    hash the lookups couldn't find on any chain gets no chain at all. Returns
+    (None, None) unless exactly one transaction on one chain is identified, the
+    answer text is never scanned.
+    """
+    lookups = looked_up_transactions(messages)
+    found = {
+        (tx_hash.lower(), chain[0])
+        for tx_hash, chain in lookups
+        if len(chain) == 1 and response_cache.get_transaction(tx_hash, chain)
+    }
+    if not found:
+        looked_up = {tx_hash.lower() for tx_hash, _ in lookups}
+        tx_hashes = {
+            tx_hash.lower() for tx_hash in chains.TX_HASH_RE.findall(query)
+        } - looked_up
+        chain_id = chains.find_chain_id(query)
+        if chain_id is not None:
+            found = {(tx_hash, chain_id) for tx_hash in tx_hashes}
+
+    if len(found) == 1:
+        tx_hash, chain_id = found.pop()
+        if isinstance(chain_id, int):
+            return tx_hash, chain_id
+    return None, None
+
+
+def to_answer(query: str, result) -> AgentAnswer:
+    """Build the AgentAnswer for a finished agent run."""
+    tx_hash, chain_id = find_transaction(query, result.all_messages())
+    return AgentAnswer(text=result.data, tx_hash=tx_hash, chain_id=chain_id)
+
+
+@functools.lru_cache(maxsize=1)
+def get_services():
+    """Initialize thirdweb services and AI agent on first use."""
+    insight, nebula, blockchain_tools = thirdweb_client.get_thirdweb_services()
 
     agent = Agent(
         "openai:gpt-4o-mini",
-        tools=blockchain_tools,
+        tools=[
+            *blockchain_tools,
+            Tool(analyze_tx, name="analyze_transaction"),
+            Tool(analyze_txs, name="analyze_transactions"),
+        ],
         system_prompt=(
             "You are a helpful blockchain assistant. You can use the thirdweb tools "
             "to interact with the blockchain and provide insights about transactions."
@@ -28,15 +194,53 @@ def initialize_services():
     return insight, nebula, agent
 
 
-# Initialize services
-insight, nebula, agent = initialize_services()
+async def _stream_text(node, ctx, on_text: Callable[[str], None]) -> None:
+    """Pass the text of one model response to on_text as it is generated."""
+    async with node.stream(ctx) as stream:
+        async for event in stream:
+            if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                on_text(event.part.content)
+            elif isinstance(event, PartDeltaEvent) and isinstance(
+                event.delta, TextPartDelta
+            ):
+                on_text(event.delta.content_delta)
 
 
-@agent.tool(name="analyze_transaction")
-def analyze_tx(ctx: RunContext, tx_hash: str, chain_id: int) -> dict:
-    """Analyze a transaction hash to get raw transaction data."""
-    params = {"chain": [chain_id] if not isinstance(chain_id, list) else chain_id}
-    return insight._get(f"resolve/{tx_hash}", params)
+async def run_agent(
+    query: str, on_text: Optional[Callable[[str], None]] = None
+) -> AgentAnswer:
+    """
+    Run the agent on a query, answering repeated questions from the cache.
+
+    If on_text is given, the text of each model response, including any remarks
+    made before calling a tool, is streamed to it piece by piece as the model
+    generates it. Only the final answer is returned and cached.
+    """
+    cached = response_cache.get_response(query)
+    if cached is not None:
+        answer = AgentAnswer.model_validate(cached)
+        if on_text:
+            on_text(answer.text)
+        return answer
+
+    _, _, agent = get_services()
+    if on_text is None:
+        result = await agent.run(query)
+    else:
+        # Walk the run node by node rather than using run_stream, which stops at
+        # the first text part and would return any preamble before a tool call
+        # as the answer
+        async with agent.iter(query) as run:
+            async for node in run:
+                if Agent.is_model_request_node(node):
+                    await _stream_text(node, run.ctx, on_text)
+        result = run.result
+
+    answer = to_answer(query, result)
+    response_cache.set_response(
+        query, answer.model_dump(), looked_up_transactions(result.all_messages())
+    )
+    return answer
 
 
 async def main():
@@ -48,10 +252,15 @@ async def main():
     for query in queries:
         print(f"\n\nQuery: {query}")
         print("-" * 50)
-        result = await agent.run(query)
+        answer = await run_agent(query)
         print("\nResult:")
-        print(result.data)
+        print(answer.text)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
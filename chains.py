@@ -0,0 +1,62 @@
+"""
+Chain Metadata
+--------------
+Chain IDs, block explorer URLs and helpers for finding transactions and chains
+mentioned in free text.
+"""
+
+import re
+from typing import Optional
+
+# Chain IDs for chain names commonly used in questions
+CHAIN_IDS = {
+    "ethereum": 1,
+    "base": 8453,
+    "polygon": 137,
+    "arbitrum": 42161,
+    "optimism": 10,
+    "avalanche": 43114,
+    "binance": 56,
+    "bsc": 56,
+    "fantom": 250,
+    "gnosis": 100,
+}
+
+# Block explorer transaction URLs by chain ID
+EXPLORERS = {
+    1: "https://etherscan.io/tx/",
+    8453: "https://basescan.org/tx/",
+    137: "https://polygonscan.com/tx/",
+    42161: "https://arbiscan.io/tx/",
+    10: "https://optimistic.etherscan.io/tx/",
+    43114: "https://snowtrace.io/tx/",
+    56: "https://bscscan.com/tx/",
+    250: "https://ftmscan.com/tx/",
+    100: "https://gnosisscan.io/tx/",
+}
+
+TX_HASH_RE = re.compile(r"\b0x[0-9a-fA-F]{64}\b")
+_CHAIN_ID_RE = re.compile(r"\bchain[\s_-]*id\W{0,5}(\d+)", re.IGNORECASE)
+# A chain name followed by a testnet name is a testnet without an explorer here,
+# and "base fee" is gas pricing rather than the Base chain
+_CHAIN_NAME_RE = re.compile(
+    r"\b("
+    + "|".join(CHAIN_IDS)
+    + r")\b(?![\s-]+(?:fee|sepolia|goerli|holesky|mumbai|amoy|fuji|testnet)\b)",
+    re.IGNORECASE,
+)
+
+
+def find_chain_id(text: str) -> Optional[int]:
+    """Find the chain a text refers to, preferring an explicit chain ID over a name."""
+    match = _CHAIN_ID_RE.search(text)
+    if match:
+        return int(match.group(1))
+    match = _CHAIN_NAME_RE.search(text)
+    return CHAIN_IDS[match.group(1).lower()] if match else None
+
+
+def explorer_link(tx_hash: str, chain_id: int) -> Optional[str]:
+    """Build the block explorer link for a transaction, if the chain has one."""
+    explorer = EXPLORERS.get(chain_id)
+    return explorer + tx_hash if explorer else None
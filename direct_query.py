@@ -7,16 +7,60 @@ and post the results as a Twitter thread, without waiting for mentions.
 """
 
 import asyncio
+import functools
 import sys
+from typing import TYPE_CHECKING
 
-import basic_agent
-import thread_creator
-from thread_creator import TwitterThread, generate_twitter_thread
-from twitter_bot import client
-from pydantic_ai.tools import RunContext
+from aioconsole import ainput
 
+if TYPE_CHECKING:
+    from basic_agent import AgentAnswer
+    from thread_creator import TwitterThread
 
-def post_thread(thread, reply_to_id=None):
+
+# The agent, thread and Twitter modules pull in pydantic_ai, thirdweb_ai and
+# tweepy, so they are only imported once they are needed, letting the prompt
+# show up straight away
+
+
+@functools.cache
+def _basic_agent():
+    import basic_agent
+
+    return basic_agent
+
+
+@functools.cache
+def _thread_creator():
+    import thread_creator
+
+    return thread_creator
+
+
+@functools.cache
+def _twitter_bot():
+    import twitter_bot
+
+    return twitter_bot
+
+
+def load_agent():
+    """Import and build the blockchain agent, meant to run in a worker thread."""
+    return _basic_agent().get_services()
+
+
+def prefetch_when_ready(warmup: asyncio.Task, query: str) -> None:
+    """Start looking up the question's transactions as soon as the agent is loaded."""
+
+    def prefetch(task: asyncio.Task) -> None:
+        # A failed warmup is reported when the agent is queried
+        if not task.cancelled() and task.exception() is None:
+            _basic_agent().prefetch_transactions(query)
+
+    warmup.add_done_callback(prefetch)
+
+
+async def post_thread(thread, reply_to_id=None):
     """
     Post a thread of tweets, either as standalone or as a reply.
 
@@ -25,29 +69,30 @@ def post_thread(thread, reply_to_id=None):
         reply_to_id: Optional ID of tweet to reply to, or None for standalone thread
     """
     print("\nPosting thread to Twitter...")
+    twitter_bot = _twitter_bot()
+    post_reply = twitter_bot.post_reply
 
-    # Post the first tweet (either standalone or as a reply)
-    response1 = client.create_tweet(
-        text=thread.tweet1, in_reply_to_tweet_id=reply_to_id
-    )
-    print(f"Posted first tweet: {thread.tweet1}")
+    # Reuse one connection for all three tweets
+    await twitter_bot.open_session()
+    try:
+        # Post the first tweet (either standalone or as a reply)
+        response1 = await post_reply(thread.tweet1, reply_to_id)
+        print(f"Posted first tweet: {thread.tweet1}")
 
-    # Post the second tweet as a reply to the first
-    response2 = client.create_tweet(
-        text=thread.tweet2, in_reply_to_tweet_id=response1.data["id"]
-    )
-    print(f"Posted second tweet: {thread.tweet2}")
+        # Post the second tweet as a reply to the first
+        response2 = await post_reply(thread.tweet2, response1.data["id"])
+        print(f"Posted second tweet: {thread.tweet2}")
 
-    # Post the third tweet as a reply to the second
-    response3 = client.create_tweet(
-        text=thread.tweet3, in_reply_to_tweet_id=response2.data["id"]
-    )
-    print(f"Posted third tweet: {thread.tweet3}")
+        # Post the third tweet as a reply to the second
+        response3 = await post_reply(thread.tweet3, response2.data["id"])
+        print(f"Posted third tweet: {thread.tweet3}")
+    finally:
+        await twitter_bot.close_session()
 
     return response1.data["id"]
 
 
-async def query_agent(query: str) -> str:
+async def query_agent(query: str) -> "AgentAnswer":
     """
     Send a query to the blockchain agent and get the response.
 
@@ -55,42 +100,46 @@ async def query_agent(query: str) -> str:
         query: The question to ask the agent
 
     Returns:
-        The formatted response from the agent
+        The agent's answer, with the transaction it is about if known
     """
     print(f"Querying agent: {query}")
 
     try:
-        # Get the agent result
-        result = await basic_agent.agent.run(query)
-        agent_result = result.data
+        # Stream the agent result to the terminal as it is generated
+        agent_result = await _basic_agent().run_agent(
+            query, on_text=lambda text: print(text, end="", flush=True)
+        )
 
-        print("Agent response received")
+        print("\nAgent response received")
         return agent_result
     except RuntimeError as e:
         if "This event loop is already running" in str(e):
             # We're being called from a context where there's already an event loop
             # Use run_sync instead which is designed for this case
             print("Using synchronous agent call instead...")
-            result = basic_agent.agent.run_sync(query)
-            return result.data
+            _, _, agent = _basic_agent().get_services()
+            result = agent.run_sync(query)
+            return _basic_agent().to_answer(query, result)
         else:
             # Re-raise if it's a different RuntimeError
             raise
 
 
-async def safe_generate_thread(agent_result: str) -> TwitterThread:
+async def safe_generate_thread(agent_result: "AgentAnswer") -> "TwitterThread":
     """
     Generate a Twitter thread using the thread generator.
 
     Args:
-        agent_result: The raw text from the agent response
+        agent_result: The agent's answer
 
     Returns:
         A TwitterThread object
     """
-    # No need for RunContext as the generate_twitter_thread function
-    # only takes the data parameter
-    return await generate_twitter_thread(agent_result)
+    # The explorer link comes from the transaction the agent looked up, not from
+    # the text of its answer
+    return await _thread_creator().generate_twitter_thread(
+        agent_result.text, agent_result.tx_hash, agent_result.chain_id
+    )
 
 
 async def main():
@@ -98,42 +147,52 @@ async def main():
         # Simple banner
         print("\n=== Blockchain Twitter Bot - Direct Query ===\n")
 
+        # Load and build the agent in the background while the user is typing
+        warmup = asyncio.create_task(asyncio.to_thread(load_agent))
+
         # Just ask for the prompt directly
         print("Enter your blockchain question:")
-        query = input("> ").strip()
+        query = (await ainput("> ")).strip()
+
+        # Start looking up any transaction in the question while the user confirms
+        prefetch_when_ready(warmup, query)
 
         # Make sure we got the full input
         print(f'\nYou asked: "{query}"')
-        confirm = input("Is this correct? (y/n): ").lower().strip()
+        confirm = (await ainput("Is this correct? (y/n): ")).lower().strip()
 
         if not confirm.startswith("y"):
             print("Let's try again with your complete question.")
             print("Enter your complete blockchain question:")
-            query = input("> ").strip()
+            query = (await ainput("> ")).strip()
+            prefetch_when_ready(warmup, query)
             print(f'\nYou asked: "{query}"')
 
         # Ask if they want to reply to a tweet (optional)
         reply_choice = (
-            input("\nDo you want to reply to an existing tweet? (y/n): ")
+            (await ainput("\nDo you want to reply to an existing tweet? (y/n): "))
             .lower()
             .strip()
         )
         reply_to = None
         if reply_choice.startswith("y"):
-            reply_to = input("Enter the tweet ID to reply to: ").strip()
+            reply_to = (await ainput("Enter the tweet ID to reply to: ")).strip()
 
         # Ask if they want to post to Twitter
         post_choice = (
-            input("\nDo you want to post this to Twitter? (y/n): ").lower().strip()
+            (await ainput("\nDo you want to post this to Twitter? (y/n): "))
+            .lower()
+            .strip()
         )
         dry_run = not post_choice.startswith("y")
 
         # Query the agent with the natural language prompt
         print("\nSending your question to the blockchain agent...")
         try:
+            await warmup
             agent_result = await query_agent(query)
 
-            if not agent_result:
+            if not agent_result.text:
                 print(
                     "\n⚠️ Warning: Agent returned an empty response. Please try a different query."
                 )
@@ -153,7 +212,7 @@ async def main():
             print("Agent response received but could not generate a thread.")
             print("Raw agent response:")
             print("-" * 50)
-            print(agent_result)
+            print(agent_result.text)
             print("-" * 50)
             return
 
@@ -168,7 +227,7 @@ async def main():
         # Post the thread if not a dry run
         if not dry_run:
             try:
-                thread_id = post_thread(thread, reply_to)
+                thread_id = await post_thread(thread, reply_to)
                 print(f"\n✅ Thread posted successfully! First tweet ID: {thread_id}")
             except Exception as e:
                 print(f"\n❌ Error posting to Twitter: {e}")
@@ -188,4 +247,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
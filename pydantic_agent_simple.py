@@ -6,37 +6,53 @@ the thirdweb SDK with a simplified Pydantic model structure.
 """
 
 import asyncio
-import os
-from datetime import datetime
-from typing import Dict, Any, Optional
+import functools
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from thirdweb_ai import Insight, Nebula
-from thirdweb_ai.adapters.pydantic_ai import get_pydantic_ai_tools
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
+from pydantic_ai import Agent, RunContext, Tool
+
+import response_cache
+import thirdweb_client
 
 
 class TransactionData(BaseModel):
     """Simplified structured representation of blockchain transaction data."""
 
+    # Fields are read straight from an Insight transaction (snake_case, e.g.
+    # from_address and block_timestamp), falling back to the RPC-style camelCase
+    # keys. Insight may send wei amounts as numbers, value keeps them as strings.
+    model_config = ConfigDict(
+        coerce_numbers_to_str=True, ignored_types=(functools.cached_property,)
+    )
+
     # Basic transaction info
     transaction_hash: str = Field(description="The hash of the transaction")
     chain_id: int = Field(
         description="The ID of the blockchain where this transaction occurred"
     )
     block_number: Optional[int] = Field(
-        None, description="The block number containing this transaction"
+        None,
+        validation_alias=AliasChoices("block_number", "blockNumber"),
+        description="The block number containing this transaction",
     )
     timestamp: Optional[int] = Field(
-        None, description="The Unix timestamp when the transaction was processed"
+        None,
+        validation_alias=AliasChoices("timestamp", "block_timestamp"),
+        description="The Unix timestamp when the transaction was processed",
     )
 
     # Transaction participants
     from_address: Optional[str] = Field(
-        None, description="The address that sent the transaction"
+        None,
+        validation_alias=AliasChoices("from_address", "from"),
+        description="The address that sent the transaction",
     )
     to_address: Optional[str] = Field(
-        None, description="The address that received the transaction"
+        None,
+        validation_alias=AliasChoices("to_address", "to"),
+        description="The address that received the transaction",
     )
 
     # Transaction economics
@@ -44,9 +60,15 @@ class TransactionData(BaseModel):
         "0", description="The value transferred in the transaction (in wei)"
     )
     gas_used: Optional[int] = Field(
-        None, description="The amount of gas used by the transaction"
+        None,
+        validation_alias=AliasChoices("gas_used", "gasUsed"),
+        description="The amount of gas used by the transaction",
+    )
+    gas_price: Optional[int] = Field(
+        None,
+        validation_alias=AliasChoices("gas_price", "gasPrice"),
+        description="The gas price in wei",
     )
-    gas_price: Optional[int] = Field(None, description="The gas price in wei")
 
     # Status
     status: Optional[int] = Field(
@@ -58,79 +80,73 @@ class TransactionData(BaseModel):
         default_factory=dict, description="The complete raw transaction data"
     )
 
-    def get_datetime(self) -> Optional[datetime]:
-        """Convert the Unix timestamp to a human-readable datetime object."""
+    @functools.cached_property
+    def datetime_utc(self) -> Optional[datetime]:
+        """The Unix timestamp as a UTC datetime, computed once per transaction."""
         if self.timestamp:
-            return datetime.fromtimestamp(self.timestamp)
+            return datetime.fromtimestamp(self.timestamp, timezone.utc)
         return None
 
 
-def initialize_services():
-    """Initialize thirdweb services and AI agent."""
-    insight = Insight(secret_key=os.getenv("THIRDWEB_SECRET_KEY"), chain_id=1)
-    nebula = Nebula(secret_key=os.getenv("THIRDWEB_SECRET_KEY"))
-    blockchain_tools = get_pydantic_ai_tools(insight.get_tools() + nebula.get_tools())
-
-    agent = Agent(
-        "openai:gpt-4o-mini",
-        tools=blockchain_tools,
-        system_prompt=(
-            "You are a helpful blockchain assistant. You can use the thirdweb tools "
-            "to interact with the blockchain and provide insights about transactions."
-        ),
-    )
-    return insight, nebula, agent
-
-
-# Initialize services
-insight, nebula, agent = initialize_services()
-
-
-@agent.tool(name="resolve_transaction")
-def resolve_tx(ctx: RunContext, tx_hash: str, chain_id: int) -> TransactionData:
+async def resolve_tx(ctx: RunContext, tx_hash: str, chain_id: int) -> TransactionData:
     """Resolve a transaction hash to get structured transaction data."""
     # Prepare API parameters
     params = {"chain": [chain_id] if not isinstance(chain_id, list) else chain_id}
 
-    # Fetch transaction data from API
-    raw_result = insight._get(f"resolve/{tx_hash}", params)
-
-    # Create a normalized transaction data object
-    tx_data = {
-        "transaction_hash": tx_hash,
-        "chain_id": chain_id,
-        "raw_data": raw_result,
-    }
-
-    # Extract commonly used fields if they exist
-    if isinstance(raw_result, dict):
-        # Map common field names (handling variations)
-        if "blockNumber" in raw_result:
-            tx_data["block_number"] = raw_result["blockNumber"]
-
-        if "from" in raw_result:
-            tx_data["from_address"] = raw_result["from"]
-
-        if "to" in raw_result:
-            tx_data["to_address"] = raw_result["to"]
-
-        if "value" in raw_result:
-            tx_data["value"] = raw_result["value"]
+    # Fetch transaction data, reusing earlier lookups of the same transaction
+    raw_result = response_cache.get_transaction(tx_hash, params["chain"])
+    if raw_result is None:
+        insight, _, _ = thirdweb_client.get_thirdweb_services()
+        raw_result = await thirdweb_client.service_get(
+            insight, f"resolve/{tx_hash}", params
+        )
+        response_cache.set_transaction(tx_hash, params["chain"], raw_result)
+
+    # Insight wraps results as {"data": {"transactions": [...]}}, let the model
+    # pick the fields it knows out of the transaction itself
+    data = raw_result.get("data") if isinstance(raw_result, dict) else None
+    transactions = data.get("transactions") if isinstance(data, dict) else None
+    fields = {}
+    if isinstance(transactions, list) and transactions:
+        fields = transactions[0] if isinstance(transactions[0], dict) else {}
+    return TransactionData.model_validate(
+        {
+            **fields,
+            "transaction_hash": tx_hash,
+            "chain_id": chain_id,
+            "raw_data": raw_result,
+        }
+    )
 
-        if "gasUsed" in raw_result:
-            tx_data["gas_used"] = raw_result["gasUsed"]
 
-        if "gasPrice" in raw_result:
-            tx_data["gas_price"] = raw_result["gasPrice"]
+async def resolve_txs(
+    ctx: RunContext, tx_hashes: List[str], chain_id: int
+) -> List[TransactionData]:
+    """Resolve several transaction hashes on the same chain in a single call."""
+    # Insight has no batch resolve endpoint, so issue the lookups concurrently
+    return await asyncio.gather(
+        *(resolve_tx(ctx, tx_hash, chain_id) for tx_hash in tx_hashes)
+    )
 
-        if "timestamp" in raw_result:
-            tx_data["timestamp"] = raw_result["timestamp"]
 
-        if "status" in raw_result:
-            tx_data["status"] = raw_result["status"]
+@functools.lru_cache(maxsize=1)
+def get_services():
+    """Initialize thirdweb services and AI agent on first use."""
+    insight, nebula, blockchain_tools = thirdweb_client.get_thirdweb_services()
 
-    # Create and return the structured model
-    return TransactionData(**tx_data)
+    agent = Agent(
+        "openai:gpt-4o-mini",
+        tools=[
+            *blockchain_tools,
+            Tool(resolve_tx, name="resolve_transaction"),
+            Tool(resolve_txs, name="resolve_transactions"),
+        ],
+        system_prompt=(
+            "You are a helpful blockchain assistant. You can use the thirdweb tools "
+            "to interact with the blockchain and provide insights about transactions."
+        ),
+    )
+    return insight, nebula, agent
 
 
 async def main():
@@ -139,6 +155,7 @@ async def main():
         "Can you analyze this transaction 0x4db65f81c76a596073d1eddefd592d0c3f2ef3d80f49dafee445d37e5444a3ad in Base?",
     ]
 
+    _, _, agent = get_services()
     for query in queries:
         print(f"\n\nQuery: {query}")
         print("-" * 50)
@@ -148,4 +165,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -0,0 +1,143 @@
+"""
+Response Cache
+--------------
+Persistent cache for resolved transactions and agent responses, backed by
+SQLite with an in-memory front. Mined transactions never change, so entries
+are kept indefinitely. Agent responses are only cached for questions about
+transactions that were all found, since anything else can change.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import chains
+
+CACHE_PATH = os.getenv(
+    "ASKPAYXN_CACHE_PATH", os.path.join(".cache", "responses.sqlite3")
+)
+
+# Questions about changing chain state must always hit the agent
+_VOLATILE_QUERY = re.compile(r"\b(latest|current)\b", re.IGNORECASE)
+_HANDLE = re.compile(r"@\w+")
+
+# Most recently used entries kept in memory in front of SQLite, bounded since
+# the bot runs indefinitely
+MEMORY_SIZE = 256
+_memory: OrderedDict[str, Any] = OrderedDict()
+_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the cache database on first use."""
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        # Opened by whichever thread uses the cache first, so let every thread
+        # share it under the lock
+        _db = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+    return _db
+
+
+def _remember(key: str, value: Any) -> None:
+    # Callers hold _lock
+    _memory[key] = value
+    _memory.move_to_end(key)
+    if len(_memory) > MEMORY_SIZE:
+        _memory.popitem(last=False)
+
+
+def _get(key: str) -> Optional[Any]:
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+        row = (
+            _connect()
+            .execute("SELECT value FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        _remember(key, value)
+        return value
+
+
+def _set(key: str, value: Any) -> None:
+    with _lock:
+        _remember(key, value)
+        db = _connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+
+
+def _transaction_key(tx_hash: str, chain: list[int]) -> str:
+    return f"tx:{tx_hash.lower()}:{','.join(str(c) for c in sorted(chain))}"
+
+
+def get_transaction(tx_hash: str, chain: list[int]) -> Optional[dict]:
+    """Return the cached resolve result for a transaction, if any."""
+    return _get(_transaction_key(tx_hash, chain))
+
+
+def set_transaction(tx_hash: str, chain: list[int], result: dict) -> None:
+    """Cache a resolve result, skipping lookups that found no transaction yet."""
+    data = result.get("data") if isinstance(result, dict) else None
+    if isinstance(data, dict) and data.get("transactions"):
+        _set(_transaction_key(tx_hash, chain), result)
+
+
+def normalize_query(query: str) -> Optional[str]:
+    """
+    Reduce a query to its cache key, or None if it must not be cached.
+
+    Twitter handles, case and whitespace are ignored so the same question
+    asked in different mentions maps to the same entry.
+    """
+    if _VOLATILE_QUERY.search(query):
+        return None
+    normalized = " ".join(_HANDLE.sub(" ", query).lower().split())
+    return f"answer:{normalized}" if normalized else None
+
+
+def get_response(query: str) -> Optional[dict]:
+    """Return the cached agent answer for a query, if any."""
+    key = normalize_query(query)
+    return _get(key) if key else None
+
+
+def set_response(
+    query: str, response: dict, lookups: list[tuple[str, list[int]]]
+) -> None:
+    """
+    Cache an agent answer (as a JSON-serializable dict) for a query.
+
+    Only answers about specific transactions are kept, and only once every
+    transaction hash in the query was found by one of the agent's lookups
+    (given as (hash, chain) pairs). A "not found yet" answer or one about
+    balances or prices would otherwise be served to every later asker.
+    """
+    key = normalize_query(query)
+    hashes = {tx_hash.lower() for tx_hash in chains.TX_HASH_RE.findall(query)}
+    if not key or not response.get("text") or not hashes:
+        return
+
+    found = {
+        tx_hash.lower()
+        for tx_hash, chain in lookups
+        if get_transaction(tx_hash, chain) is not None
+    }
+    if hashes <= found:
+        _set(key, response)
@@ -0,0 +1,123 @@
+"""
+Shared thirdweb HTTP Layer
+--------------------------
+This module provides connection-pooled HTTP/2 clients shared by every thirdweb
+call, plus helpers for exposing thirdweb services to Pydantic AI agents without
+blocking the event loop.
+"""
+
+import asyncio
+import functools
+import json
+import os
+from importlib.metadata import version
+from typing import Any, Optional
+
+import httpx
+from pydantic_ai import RunContext, Tool
+from pydantic_ai.tools import ToolDefinition
+from thirdweb_ai import Insight, Nebula
+from thirdweb_ai.services.service import Service
+
+# Tool parameter schemas only change with the SDK, so cache them per version
+TOOL_SCHEMA_CACHE = os.path.join(
+    ".cache", f"thirdweb_tool_schemas-{version('thirdweb-ai')}.json"
+)
+
+TIMEOUT = 120.0
+LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+# Used by the thirdweb SDK's own synchronous tools
+sync_client = httpx.Client(
+    timeout=TIMEOUT,
+    transport=httpx.HTTPTransport(http2=True, retries=5, limits=LIMITS),
+)
+
+# Used by the agents' own async tools
+async_client = httpx.AsyncClient(
+    timeout=TIMEOUT,
+    transport=httpx.AsyncHTTPTransport(http2=True, retries=5, limits=LIMITS),
+)
+
+
+def use_shared_client(service: Service) -> Service:
+    """Route a thirdweb service through the shared connection pool."""
+    service.client.close()
+    service.client = sync_client
+    return service
+
+
+async def service_get(
+    service: Service, path: str, params: Optional[dict[str, Any]] = None
+) -> Any:
+    """Async equivalent of a thirdweb service's GET request."""
+    url = f"{service.base_url.rstrip('/')}/{path.lstrip('/')}"
+    response = await async_client.get(
+        url, params=params, headers=service._make_headers()
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _load_tool_schemas() -> dict[str, Any]:
+    try:
+        with open(TOOL_SCHEMA_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_tool_schemas(schemas: dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(TOOL_SCHEMA_CACHE), exist_ok=True)
+        with open(TOOL_SCHEMA_CACHE, "w") as f:
+            json.dump(schemas, f)
+    except OSError as e:
+        print(f"Could not write tool schema cache: {e}")
+
+
+def get_agent_tools(*services: Service) -> list[Tool]:
+    """
+    Expose the thirdweb tools of the given services to a Pydantic AI agent.
+
+    Same as thirdweb_ai.adapters.pydantic_ai.get_pydantic_ai_tools, except the
+    SDK's blocking HTTP calls run in a worker thread instead of on the event loop,
+    and each tool's parameter schema is built once (and cached on disk) instead of
+    being regenerated on every model request.
+    """
+    tools = [tool for service in services for tool in service.get_tools()]
+
+    schemas = _load_tool_schemas()
+    missing = [tool for tool in tools if tool.name not in schemas]
+    if missing:
+        schemas.update({tool.name: tool.schema["parameters"] for tool in missing})
+        _save_tool_schemas(schemas)
+
+    def _get_tool(tool) -> Tool:
+        parameters = schemas[tool.name]
+
+        async def execute(**kwargs: Any) -> Any:
+            return await asyncio.to_thread(tool.run_json, kwargs)
+
+        async def prepare(ctx: RunContext, tool_def: ToolDefinition) -> ToolDefinition:
+            tool_def.parameters_json_schema = parameters
+            return tool_def
+
+        return Tool(
+            function=execute,
+            prepare=prepare,
+            name=tool.name,
+            description=tool.description,
+        )
+
+    return [_get_tool(tool) for tool in tools]
+
+
+@functools.lru_cache(maxsize=1)
+def get_thirdweb_services() -> tuple[Insight, Nebula, list[Tool]]:
+    """Create the thirdweb services and their agent tools once per process."""
+    insight = use_shared_client(
+        Insight(secret_key=os.getenv("THIRDWEB_SECRET_KEY"), chain_id=1)
+    )
+    nebula = use_shared_client(Nebula(secret_key=os.getenv("THIRDWEB_SECRET_KEY")))
+    return insight, nebula, get_agent_tools(insight, nebula)
@@ -1,15 +1,64 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.tools import RunContext
 import asyncio
 
+import chains
+
 
 class TwitterThread(BaseModel):
-    tweet1: str
-    tweet2: str
-    tweet3: str
+    tweet1: str = Field(description="Opening tweet introducing the transaction")
+    tweet2: str = Field(description="Second tweet with the transaction details")
+    tweet3: str = Field(
+        description="Closing tweet, ending with the block explorer link"
+    )
+
+
+# Static rules sent as the system prompt, ahead of the per-transaction data, so
+# providers with prompt caching can reuse them across calls. Keep anything
+# request-specific out of here or the shared prefix stops matching.
+THREAD_INSTRUCTIONS = """
+You are a helpful assistant that creates Twitter threads. You will be given data about a transaction on the blockchain. Write a Twitter thread about it in exactly 3 tweets, you must ALWAYS follow the instructions provided bellow.
+
+Requirements:
+- No hashtags
+- Use bullet points (•) for better readability
+- Each bullet point should be on its own line
+- NO markdown formatting (no backticks, no asterisks for bold)
+- For technical data like addresses, use clear labels: "From: 0x123..." not "**From**: `0x123...`"
+- Easy-to-read content with clear keywords and concise language
+- Natural flow between tweets, the transition between tweets should be seamless
+- Include the block explorer link in the last tweet
+- Each Tweet should be about the same length and try to be as concise as possible
+- Twitter has character limits, so keep each tweet under 280 characters
+- Use proper spacing between sentences
+- Format numbers with commas for better readability (e.g., "1,234,567" not "1234567")
+- Use proper units (e.g., "ETH" for Ether values)
+- Keep technical details clear but concise
+
+The block explorer link for the transaction is given after the transaction data. Use it exactly as given; if no link is given, leave the link out rather than making one up.
+
+Format:
+Return the text of each tweet in tweet1, tweet2 and tweet3, without any "Tweet N:" label.
+
+Example:
+tweet1: There are the details of the transaction. Hash: 0x123...abc. Block: 7,985,824.
+
+tweet2: • From: 0xdf8...200
+• To: 0x023...5f0
+• Value: 0 ETH
+• Gas Used: 108,152
+• Gas Price: 18.19 Gwei
+
+tweet3: • Transaction Type: 2 (EIP-1559)
+• Status: Success
+• Block Hash: 0xa02...b8c
+• View on explorer: https://sepolia.etherscan.io/tx/0x123...abc
+"""
 
 
 ollama_model = OpenAIModel(
@@ -20,115 +69,31 @@ ollama_model = OpenAIModel(
 agent = Agent(
     "openai:gpt-4o-mini",
     # ollama_model,
-    system_prompt=("You are a helpful assistant that creates Twitter threads."),
+    result_type=TwitterThread,
+    system_prompt=THREAD_INSTRUCTIONS,
 )
 
 
-async def generate_twitter_thread(data: str) -> TwitterThread:
-    prompt = f"""
-    Write a Twitter thread about '{data}' in exactly 3 tweets. The data is about a transaction on the blockchain you must ALWAYS follow the instructions provided bellow.
-
-    Requirements:
-    - No hashtags
-    - Use bullet points (•) for better readability
-    - Each bullet point should be on its own line
-    - NO markdown formatting (no backticks, no asterisks for bold)
-    - For technical data like addresses, use clear labels: "From:  `0x123...`" not "**From**: 0x123..."
-    - Easy-to-read content with clear keywords and concise language
-    - Natural flow between tweets, the transition between tweets should be seamless
-    - Include a link to the block explorer with the transaction hash in the last tweet
-    - Each Tweet should be about the same length and try to be as concise as possible
-    - Twitter has character limits, so keep each tweet under 280 characters
-    - Use proper spacing between sentences
-    - Format numbers with commas for better readability (e.g., "1,234,567" not "1234567")
-    - Use proper units (e.g., "ETH" for Ether values)
-    - Keep technical details clear but concise
-
-    Be sure to use the correct block explorer link for the chain, this is the list of the most common ones:
-    - Ethereum: https://etherscan.io/tx/
-    - Base: https://basescan.org/tx/
-    - Polygon: https://polygonscan.com/tx/
-    - Arbitrum: https://arbiscan.io/tx/
-    - Optimism: https://optimistic.etherscan.io/tx/
-    - Avalanche: https://snowtrace.io/tx/
-    - Binance: https://bscscan.com/tx/
-    - BSC: https://bscscan.com/tx/
-    - Fantom: https://ftmscan.com/tx/
-    - Gnosis: https://gnosisscan.io/tx/
-    
-    
-
-    Format:
-    Return the thread as plain text with each tweet on a new line, separated by line breaks:
-
-    Tweet 1: [First tweet content]
-
-    Tweet 2: [Second tweet content]
-
-    Tweet 3: [Third tweet content with block explorer link]
-
-    Example format:
-    Tweet 1: There are the details of the transaction. Hash: 0x123...abc. Block: 7,985,824.
-
-    Tweet 2: • From: 0xdf8...200
-    • To: 0x023...5f0
-    • Value: 0 ETH
-    • Gas Used: 108,152
-    • Gas Price: 18.19 Gwei
-
-    Tweet 3: • Transaction Type: 2 (EIP-1559)
-    • Status: Success
-    • Block Hash: 0xa02...b8c
-    • View on explorer: https://sepolia.etherscan.io/tx/0x123...abc
-    """
-
-    result = await agent.run(prompt)
-    raw_text = result.data
-
-    # Parse the three tweets from the raw text
-    tweets = []
-    current_tweet = []
-    for line in raw_text.split("\n"):
-        line = line.strip()
-        if line.startswith("Tweet ") and ":" in line:
-            # If we find a new tweet and already have content, add the previous tweet
-            if current_tweet:
-                tweets.append("\n".join(current_tweet))
-                current_tweet = []
-
-            # Extract just the content after "Tweet N: "
-            current_tweet = [line.split(":", 1)[1].strip()]
-        elif line and current_tweet:
-            # Append additional lines to the current tweet
-            current_tweet.append(line)
-
-    # Add the last tweet if it exists
-    if current_tweet:
-        tweets.append("\n".join(current_tweet))
-
-    # Clean up any remaining markdown artifacts
-    cleaned_tweets = []
-    for tweet in tweets:
-        # Remove any backticks
-        tweet = tweet.replace("`", "")
-        # Remove any asterisks used for bold/italic
-        tweet = tweet.replace("**", "").replace("*", "")
-        # Ensure proper spacing after bullet points
-        tweet = tweet.replace("•", " • ").replace("  •  ", " • ")
-        # Fix any double spaces while preserving line breaks
-        lines = tweet.split("\n")
-        cleaned_lines = [" ".join(line.split()) for line in lines]
-        cleaned_tweet = "\n".join(cleaned_lines)
-        cleaned_tweets.append(cleaned_tweet)
-
-    # Ensure we have exactly 3 tweets
-    while len(cleaned_tweets) < 3:
-        cleaned_tweets.append("")
-
-    # Return as TwitterThread object
-    return TwitterThread(
-        tweet1=cleaned_tweets[0], tweet2=cleaned_tweets[1], tweet3=cleaned_tweets[2]
+async def generate_twitter_thread(
+    data: str, tx_hash: Optional[str] = None, chain_id: Optional[int] = None
+) -> TwitterThread:
+    # Build the explorer link from the known transaction rather than having the
+    # model choose one, and leave it out when the transaction isn't known
+    link = chains.explorer_link(tx_hash, chain_id) if tx_hash and chain_id else None
+    if link:
+        data = f"{data}\n\nExplorer link: {link}"
+
+    # Only the transaction data varies between calls, the instructions are the
+    # system prompt. The model returns the thread as structured output.
+    result = await agent.run(data)
+
+    usage = result.usage()
+    cached_tokens = (usage.details or {}).get("cached_tokens", 0)
+    print(
+        f"Thread generation used {usage.request_tokens} prompt tokens "
+        f"({cached_tokens} cached)"
     )
+    return result.data
 
 
 async def main():
@@ -168,11 +133,20 @@ async def main():
     #### Additional Information
     - The transaction did not involve a transfer of tokens, as the value is 0, and it likely pertained to a contract interaction based on the function selector provided.
     """
-    thread = await generate_twitter_thread(data)
+    thread = await generate_twitter_thread(
+        data,
+        tx_hash="0x4db65f81c76a596073d1eddefd592d0c3f2ef3d80f49dafee445d37e5444a3ad",
+        chain_id=8453,
+    )
     print(thread.tweet1)
     print(thread.tweet2)
     print(thread.tweet3)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,10 +1,14 @@
-import tweepy
+import aiohttp
+from tweepy import StreamRule, TooManyRequests
+from tweepy.asynchronous import AsyncClient, AsyncStreamingClient
 from dotenv import load_dotenv
 import os
+import random
+import signal
 import time
 import asyncio
 
-from basic_agent import agent as blockchain_agent
+from basic_agent import get_services, run_agent
 from thread_creator import generate_twitter_thread, TwitterThread
 
 load_dotenv()
@@ -16,9 +20,23 @@ ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 ACCESS_TOKEN_SECRET = os.getenv("ACCESS_TOKEN_SECRET")
 BEARER_TOKEN = os.getenv("BEARER_TOKEN")
 
+# Tag identifying the filtered stream rule managed by this bot
+MENTION_RULE_TAG = "askpayxn-mentions"
+
+# Cap concurrent mention replies to stay inside Twitter's write rate limits
+MAX_CONCURRENT_MENTIONS = 3
+mention_semaphore = asyncio.Semaphore(MAX_CONCURRENT_MENTIONS)
+
+# Post one tweet at a time, the write rate limit is shared by the whole account
+tweet_semaphore = asyncio.Semaphore(1)
+
+# How often to retry a rate-limited tweet, and the longest reset worth waiting for
+TWEET_ATTEMPTS = 5
+MAX_RATE_LIMIT_WAIT = 15 * 60
+
 
 # Authenticate to Twitter using v2 API
-client = tweepy.Client(
+client = AsyncClient(
     consumer_key=API_KEY,
     consumer_secret=API_SECRET,
     access_token=ACCESS_TOKEN,
@@ -27,31 +45,89 @@ client = tweepy.Client(
 )
 
 
+# Share one aiohttp session across requests so consecutive calls reuse the
+# same TCP/TLS connection (AsyncClient opens a new session per request otherwise)
+async def open_session():
+    if client.session is None or client.session.closed:
+        client.session = aiohttp.ClientSession()
+    return client.session
+
+
+async def close_session():
+    if client.session is not None and not client.session.closed:
+        await client.session.close()
+    client.session = None
+
+
+# Function to work out how long to wait after a 429, preferring the reset time
+# Twitter sends over exponential backoff with jitter
+def rate_limit_delay(error, attempt):
+    reset = error.response.headers.get("x-rate-limit-reset")
+    if reset is not None:
+        return max(int(reset) - time.time(), 0) + 1
+    return min(2 * 2**attempt, 60) + random.uniform(0, 1)
+
+
+# Function to create a tweet, waiting out rate limits instead of losing the
+# agent and thread generation work that went into it
+async def create_tweet(**kwargs):
+    async with tweet_semaphore:
+        for attempt in range(TWEET_ATTEMPTS):
+            try:
+                return await client.create_tweet(**kwargs)
+            except TooManyRequests as e:
+                delay = rate_limit_delay(e, attempt)
+                if attempt == TWEET_ATTEMPTS - 1 or delay > MAX_RATE_LIMIT_WAIT:
+                    raise
+                print(f"Rate limited by Twitter, retrying in {delay:.0f}s...")
+                # Keep holding the semaphore, any other tweet would be rejected too
+                await asyncio.sleep(delay)
+
+
 # Function to post a tweet
-def post_tweet(tweet_text):
-    return client.create_tweet(text=tweet_text)
+async def post_tweet(tweet_text):
+    return await create_tweet(text=tweet_text)
+
 
+# Function to post a reply to a tweet, or a standalone tweet if tweet_id is None
+async def post_reply(tweet_text, tweet_id):
+    return await create_tweet(text=tweet_text, in_reply_to_tweet_id=tweet_id)
 
-# Function to post a reply to a tweet
-def post_reply(tweet_text, tweet_id):
-    return client.create_tweet(text=tweet_text, in_reply_to_tweet_id=tweet_id)
 
+# Filtered stream that pushes each mention of the bot as soon as it is posted
+class MentionStream(AsyncStreamingClient):
+    def __init__(self, bearer_token, pending):
+        super().__init__(bearer_token)
+        # Mentions currently being answered
+        self.pending = pending
 
-# Function to get recent mentions
-def get_recent_mentions():
-    # Get authenticated user ID
-    me = client.get_me()
-    user_id = me.data.id
+    async def on_tweet(self, tweet):
+        print(f"New mention found: {tweet.id}")
 
-    # Get recent mentions (minimum 5 required by Twitter API)
-    mentions = client.get_users_mentions(
-        id=user_id,
-        max_results=5,  # API requires minimum of 5
-        expansions=["referenced_tweets.id"],
-        tweet_fields=["created_at", "text"],
-    )
+        # Answer in the background so the stream keeps being read
+        task = asyncio.create_task(process_mention_limited(tweet))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
 
-    return mentions.data if mentions.data else []
+
+# Function to make the stream match mentions of the bot, excluding its own tweets
+# and retweets of tweets that mention it
+async def sync_mention_rule(stream):
+    me = await client.get_me()
+    username = me.data.username
+    rule_value = f"@{username} -from:{username} -is:retweet"
+
+    response = await stream.get_rules()
+    rules = [rule for rule in response.data or [] if rule.tag == MENTION_RULE_TAG]
+
+    # Only touch our own rule, other rules may belong to other apps on the project
+    stale = [rule.id for rule in rules if rule.value != rule_value]
+    if stale:
+        await stream.delete_rules(stale)
+    if not any(rule.value == rule_value for rule in rules):
+        await stream.add_rules(StreamRule(rule_value, tag=MENTION_RULE_TAG))
+
+    print(f"Listening for mentions of @{username}")
 
 
 async def process_mention(mention):
@@ -59,25 +135,26 @@ async def process_mention(mention):
 
     try:
         # Pass the exact mention text to the blockchain agent
-        result = await blockchain_agent.run(mention.text)
-        tx_data = result.data
+        answer = await run_agent(mention.text)
 
         # Generate a Twitter thread using the transaction data
-        thread = await generate_twitter_thread(tx_data)
+        thread = await generate_twitter_thread(
+            answer.text, answer.tx_hash, answer.chain_id
+        )
 
         # Post the thread as replies
         original_tweet_id = mention.id
 
         # Post first tweet as reply to the mention
-        tweet1 = post_reply(thread.tweet1, original_tweet_id)
+        tweet1 = await post_reply(thread.tweet1, original_tweet_id)
         print(f"Posted first tweet: {thread.tweet1[:30]}...")
 
         # Post second tweet as reply to the first tweet
-        tweet2 = post_reply(thread.tweet2, tweet1.data.id)
+        tweet2 = await post_reply(thread.tweet2, tweet1.data["id"])
         print(f"Posted second tweet: {thread.tweet2[:30]}...")
 
         # Post third tweet as reply to the second tweet
-        tweet3 = post_reply(thread.tweet3, tweet2.data.id)
+        tweet3 = await post_reply(thread.tweet3, tweet2.data["id"])
         print(f"Posted third tweet: {thread.tweet3[:30]}...")
 
         print(f"Thread posted successfully in response to mention {mention.id}")
@@ -86,43 +163,56 @@ async def process_mention(mention):
         print(f"Error processing mention: {e}")
 
 
+async def process_mention_limited(mention):
+    async with mention_semaphore:
+        await process_mention(mention)
+
+
 async def main():
     print("Starting Twitter bot...")
 
-    # Get the initial mention as reference point
-    initial_mentions = get_recent_mentions()
-
-    # Store initial mention ID to ignore on first run
-    last_processed_id = None
-    if initial_mentions:
-        # Get the most recent mention (first in the list)
-        last_processed_id = initial_mentions[0].id
-        print(
-            f"Initial mention ID recorded: {last_processed_id}. Will only process new mentions."
-        )
+    # Build the agent up front rather than on the first mention
+    get_services()
 
-    while True:
+    # Stop listening on SIGINT/SIGTERM instead of dying mid-thread
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            mentions = get_recent_mentions()
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Not supported by the Windows event loop
+            pass
 
-            if mentions and last_processed_id != mentions[0].id:
-                # Only process the most recent mention (first in the list)
-                mention = mentions[0]
-                print(f"New mention found: {mention.id}")
+    pending = set()
+    stream = MentionStream(BEARER_TOKEN, pending)
 
-                await process_mention(mention)
-                last_processed_id = mention.id
-            else:
-                print("No new mentions found")
+    await open_session()
+    try:
+        await sync_mention_rule(stream)
 
-            # Wait 15 minutes before checking again
-            print("Waiting 15 minutes before checking for new mentions...")
-            time.sleep(15 * 60)
+        # tweepy reconnects with backoff on its own, so this only ends on shutdown
+        stream_task = stream.filter(tweet_fields=["created_at", "text"])
+        stop_task = asyncio.create_task(stop.wait())
+        await asyncio.wait(
+            [stream_task, stop_task], return_when=asyncio.FIRST_COMPLETED
+        )
+        stop_task.cancel()
 
-        except Exception as e:
-            print(f"Error in main loop: {e}")
-            time.sleep(60)  # Wait a minute before retrying
+        print("Shutting down Twitter bot...")
+        stream.disconnect()
+        await stream_task
+    finally:
+        if pending:
+            print(f"Waiting for {len(pending)} in-flight mention(s) to finish...")
+            await asyncio.gather(*pending, return_exceptions=True)
+        await close_session()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())